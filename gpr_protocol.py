@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Shared Cobra Zond-12e protocol helpers.
+
+client.py, inspector.py and gpr_ros2_node each carried their own copies of
+the setup-string builder, the handshake, and the trace-read loop; this
+module is the single canonical implementation so any protocol change or
+optimisation lands in one place.
+"""
+import functools
+import socket
+
+import numpy as np
+
+try:
+    # optional C fast path: recv + in-place byte swap straight into the
+    # output buffer (python3 setup.py build_ext --inplace)
+    import gpr_io
+except ImportError:
+    gpr_io = None
+
+try:
+    # optional middle tier when gpr_io isn't built: JIT-compiled decode
+    # that runs one parallel pass over the raw bytes with the GIL released
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _decode_be16(raw, out):
+        for i in numba.prange(out.shape[0]):
+            v = (raw[2 * i] << 8) | raw[2 * i + 1]
+            if v >= 32768:
+                v -= 65536
+            out[i] = v
+
+# Acknowledge message from the GPR after P1
+ACK = b'\x00\x7f\x00\x7f'
+
+# ask the kernel to satisfy the whole count in one recv where supported
+# (Linux; harmlessly 0 elsewhere — the retry loop covers short reads)
+_MSG_WAITALL = getattr(socket, 'MSG_WAITALL', 0)
+
+# sampleQuantity → bits 05–06
+_SAMPLE_BITS = {128: '00', 256: '10', 512: '01', 1024: '11'}
+
+# timeRange (ns) → (bits 02–04, bits 13–14)
+_RANGE_BITS = {
+    25:   ('000', '10'),
+    50:   ('000', '00'),
+    100:  ('100', '00'),
+    200:  ('010', '00'),
+    300:  ('110', '00'),
+    2000: ('111', '00'),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def create_setup_message(sample_quantity: int, time_range: int) -> str:
+    """
+    Build the Cobra Zond-12e setup string (protocol T...).
+    Unknown quantities fall back to 512 samples, unknown ranges to 50 ns
+    bits — same defaults the old if/elif ladders used.
+    """
+    m_05_06 = _SAMPLE_BITS.get(sample_quantity, '01')
+    m_02_04, m_13_14 = _RANGE_BITS.get(time_range, ('000', '00'))
+    return (
+        f'T 11{m_02_04}{m_05_06}0'  # marker, Tx off, cables combined, range hi, quantity, m_07
+        f'00000{m_13_14}0'          # m_08_10, m_11_12, range lo, m_15
+        '1010'                      # sounding regime
+        '00'                        # single channel
+        '1010110010'
+    )
+
+
+def recv_exact(sock, mv, stop=None):
+    """
+    Fill the whole memoryview from the socket (raises on EOF).
+    MSG_WAITALL collapses the common case to a single syscall; short
+    returns (signals, timeouts, platforms without it) loop at the saved
+    offset, so a stalled link never splits a trace.  With a stop event
+    the retry loop absorbs socket timeouts until the event aborts it;
+    without one, socket.timeout propagates so callers see a stalled
+    link after the socket's own timeout.
+    """
+    n = 0
+    total = len(mv)
+    while n < total:
+        try:
+            k = sock.recv_into(mv[n:], total - n, _MSG_WAITALL)
+        except socket.timeout:
+            if stop is None:
+                raise
+            if stop.is_set():
+                raise IOError("Stopped mid-trace")
+            continue
+        if not k:
+            raise IOError("Socket closed mid-trace")
+        n += k
+
+
+def connect_and_setup(host, port, quantity, time_range,
+                      rcvbuf=4 * 1024 * 1024, timeout=5.0):
+    """
+    Connect to the GPR, tune the socket (no Nagle, keepalive, large
+    RCVBUF), run the T…/P1 handshake, and return the ready socket.
+    """
+    sock = socket.create_connection((host, port), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.sendall((create_setup_message(quantity, time_range) + "\n").encode('ascii'))
+    sock.sendall(b"P1\n")
+    # recv(4) may legally return fewer bytes; read exactly 4 and compare raw
+    ack = bytearray(len(ACK))
+    recv_exact(sock, memoryview(ack))
+    if ack != ACK:
+        sock.close()
+        raise IOError(f"Bad ACK from GPR: {bytes(ack)!r}")
+    # discard dummy byte
+    sock.recv(1)
+    return sock
+
+
+class TraceReader:
+    """
+    Reads traces off an open GPR socket.
+
+    Owns one reusable receive buffer; uses the gpr_io C extension when
+    available, otherwise recv_into + np.frombuffer.  read() fills `out`
+    (or an internal reusable buffer) with the main samples as native
+    int16 — the service tail is read and discarded.
+    """
+
+    def __init__(self, sock, quantity):
+        self.sock = sock
+        self.quantity = quantity
+        self.service_n = quantity // 16
+        self.main_n = quantity - self.service_n
+        self._buf = bytearray(quantity * 2)
+        self._mv = memoryview(self._buf)
+        self._u8 = np.frombuffer(self._buf, dtype=np.uint8)
+        self._out = np.empty(self.main_n, dtype=np.int16)
+        self._batch_buf = None   # sized on first read_batch call
+
+    def _timeout_ms(self):
+        # per call: the socket timeout may change after construction
+        t = self.sock.gettimeout()
+        return -1 if t is None else max(1, int(t * 1000))
+
+    def _read_c(self, out, stop):
+        # the C extension polls the fd itself, so it must be given the
+        # socket's timeout: Python-level timeouts make the fd
+        # non-blocking, and poll(fd, -1) on EAGAIN would block forever.
+        # A timed-out call returns the bytes consumed so far; loop at
+        # that offset so a transient stall never desyncs trace framing,
+        # with the same stop/timeout contract as recv_exact
+        fd = self.sock.fileno()
+        total = (self.main_n + self.service_n) * 2
+        off = 0
+        while True:
+            off = gpr_io.read_trace(fd, out, self.service_n,
+                                    self._timeout_ms(), off)
+            if off == total:
+                return out
+            if stop is None:
+                raise socket.timeout("timed out")
+            if stop.is_set():
+                raise IOError("Stopped mid-trace")
+
+    def read(self, out=None, stop=None):
+        if gpr_io is not None:
+            if out is None:
+                out = self._out
+            return self._read_c(out, stop)
+        recv_exact(self.sock, self._mv, stop)
+        if out is not None:
+            if numba is not None:
+                _decode_be16(self._u8, out)
+            else:
+                # one vectorised swap-copy straight into the caller's buffer
+                out[:] = np.frombuffer(self._buf, dtype='>i2', count=self.main_n)
+            return out
+        # no caller buffer: swap wire order in place on the receive buffer
+        # and hand back a zero-copy view (valid until the next read)
+        view = np.frombuffer(self._buf, dtype='>i2', count=self.main_n)
+        view.byteswap(inplace=True)
+        return view.view(view.dtype.newbyteorder())
+
+    def read_batch(self, out, stop=None):
+        """
+        Read out.shape[0] back-to-back traces into the rows of `out`
+        ((n, main_n) int16).  The NumPy path pulls all n trace blocks in
+        one recv, amortising the per-trace syscall across the batch; the
+        C path loops read_trace per row (already one syscall each).
+        """
+        n = out.shape[0]
+        if gpr_io is not None:
+            for i in range(n):
+                self._read_c(out[i], stop)
+            return out
+        nbytes = n * self.quantity * 2
+        if self._batch_buf is None or len(self._batch_buf) != nbytes:
+            self._batch_buf = bytearray(nbytes)
+            self._batch_mv = memoryview(self._batch_buf)
+        recv_exact(self.sock, self._batch_mv, stop)
+        arr = np.frombuffer(self._batch_buf, dtype='>i2').reshape(n, self.quantity)
+        out[:] = arr[:, :self.main_n]
+        return out
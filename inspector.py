@@ -1,71 +1,86 @@
 #!/usr/bin/env python3
 import argparse
+import os
 import socket
 import sys
-import binascii
 import gc
 import threading
-import queue
+import time
 
 import numpy as np
 import cv2
 
-ACK_HEX = b'007f007f'
-
-def create_setup_message(q, rng):
-    m_N, m_00, m_01 = ' ', '1', '1'
-    m_07, m_08_10, m_11_12, m_15 = '0','000','00','0'
-    m_16_19, m_20_21, m_22_31 = '1010','00','1010110010'
-    if q==128:   m_05_06='00'
-    elif q==256: m_05_06='10'
-    elif q==512: m_05_06='01'
-    elif q==1024:m_05_06='11'
-    else:        m_05_06='01'
-    if rng==25:   m_02_04,m_13_14='000','10'
-    elif rng==50: m_02_04,m_13_14='000','00'
-    elif rng==100:m_02_04,m_13_14='100','00'
-    elif rng==200:m_02_04,m_13_14='010','00'
-    elif rng==300:m_02_04,m_13_14='110','00'
-    elif rng==2000:m_02_04,m_13_14='111','00'
-    else:         m_02_04,m_13_14='000','00'
-    return (
-        'T'+m_N+m_00+m_01+
-        m_02_04+m_05_06+m_07+
-        m_08_10+m_11_12+m_13_14+
-        m_15+m_16_19+m_20_21+m_22_31
-    )
-
-def read_one_trace(sock, q):
-    total = q * 2
-    buf = b''
-    while len(buf) < total:
-        chunk = sock.recv(total - len(buf))
-        if not chunk:
-            raise IOError("Socket closed")
-        buf += chunk
-    svc = q // 16
-    main_n = q - svc
-    return np.frombuffer(buf[: main_n*2], dtype='>i2')
-
-def reader(sock, args, data, img_q, stop_evt):
-    filled = 0
+from gpr_protocol import TraceReader, connect_and_setup
+
+# SPSC ring between the socket reader and the display loop.  Power-of-two
+# size; head is only written by the producer, tail only by the consumer,
+# and plain int assignment is atomic under the GIL.
+RING_SIZE = 256
+RING_MASK = RING_SIZE - 1
+
+# render cadence; ingest itself is never throttled
+RENDER_INTERVAL = 1.0 / 30.0
+
+# recompute the AGC percentiles once per this many ingested traces
+AGC_EVERY = 32
+
+# int16 sample → histogram bin offset.  Typed scalar: under NEP 50
+# (NumPy ≥ 2.0) a plain 32768 overflows the int16 operand and raises
+BIAS = np.int32(32768)
+
+class TraceRing:
+    def __init__(self, main_n):
+        self.slots = [np.empty(main_n, dtype=np.int16) for _ in range(RING_SIZE)]
+        self.head = 0      # next slot the producer writes
+        self.tail = 0      # next slot the consumer reads
+        self.dropped = 0   # traces discarded because the ring was full
+        self.ready = threading.Event()   # set on publish; lets the consumer sleep
+
+def reader(sock, args, ring, stop_evt):
+    """Producer: nothing but socket reads, straight into ring slots."""
+    if args.pin_core is not None and hasattr(os, 'sched_setaffinity'):
+        # keep the reader's cache state on one core, away from the GUI
+        try:
+            os.sched_setaffinity(0, {args.pin_core})
+        except OSError:
+            pass
+    tr = TraceReader(sock, args.quantity)
+
+    if args.batch > 1:
+        # batched mode: one recv per --batch traces, staged then fanned
+        # out into ring slots
+        batch = np.empty((args.batch, tr.main_n), dtype=np.int16)
+        while not stop_evt.is_set():
+            try:
+                tr.read_batch(batch, stop=stop_evt)
+            except Exception:
+                stop_evt.wait(0.05)
+                continue
+            for row in batch:
+                if ring.head - ring.tail >= RING_SIZE:
+                    ring.dropped += 1
+                    continue
+                np.copyto(ring.slots[ring.head & RING_MASK], row)
+                ring.head += 1
+            ring.ready.set()
+        return
+
     while not stop_evt.is_set():
+        full = ring.head - ring.tail >= RING_SIZE
         try:
-            trace = read_one_trace(sock, args.quantity)
+            if full:
+                tr.read(stop=stop_evt)   # drain into the scratch buffer
+            else:
+                tr.read(ring.slots[ring.head & RING_MASK], stop=stop_evt)
         except Exception:
+            # back off instead of spinning on a persistent socket error
+            stop_evt.wait(0.05)
             continue
-        if filled < args.window:
-            data[:, filled] = trace
-            filled += 1
-        else:
-            np.roll(data, -1, axis=1, out=data)
-            data[:, -1] = trace
-
-        img = ((data.astype(np.int32) + 32768) * (255/65535)).astype(np.uint8)
-        if not img_q.empty():
-            try: img_q.get_nowait()
-            except: pass
-        img_q.put(img)
+        if full:
+            ring.dropped += 1
+            continue
+        ring.head += 1
+        ring.ready.set()
 
 def main():
     p = argparse.ArgumentParser("GPR B-scan fill→scroll windowed")
@@ -74,27 +89,36 @@ def main():
     p.add_argument('--quantity', type=int, default=1024, help="samples per trace")
     p.add_argument('--range',    type=int, default=100,  help="timeRange (ns)")
     p.add_argument('--window',   type=int, default=1000, help="columns on screen")
+    p.add_argument('--rcvbuf',   type=int, default=4*1024*1024,
+                   help="SO_RCVBUF size in bytes (default 4 MB)")
+    p.add_argument('--pin-core', type=int, default=None,
+                   help="pin the reader thread to this CPU core")
+    p.add_argument('--batch',    type=int, default=1,
+                   help="traces per bulk read (>1 trades latency for "
+                        "fewer syscalls at fast trace rates)")
     args = p.parse_args()
 
-    setup = create_setup_message(args.quantity, args.range)
-    sock  = socket.create_connection((args.host, args.port), timeout=5)
-    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-    gc.disable()
-    sock.sendall((setup + "\n").encode('ascii'))
-    sock.sendall(b"P1\n")
-    if binascii.hexlify(sock.recv(4)) != ACK_HEX:
-        print("Bad ACK", file=sys.stderr)
+    try:
+        sock = connect_and_setup(args.host, args.port,
+                                 args.quantity, args.range,
+                                 rcvbuf=args.rcvbuf)
+    except Exception as e:
+        print(f"Setup error: {e}", file=sys.stderr)
         sys.exit(1)
-    sock.recv(1)
+    granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    print(f"SO_RCVBUF: requested {args.rcvbuf}, granted {granted}")
+    # data phase: 1 s recv timeout so a stalled GPR surfaces quickly;
+    # TraceReader retries at the saved offset, so framing is kept
+    sock.settimeout(1.0)
 
     svc    = args.quantity // 16
     main_n = args.quantity - svc
     data   = np.zeros((main_n, args.window), dtype=np.int16)
-    img_q  = queue.Queue(maxsize=1)
+    ring   = TraceRing(main_n)
     stop_evt = threading.Event()
 
     t = threading.Thread(target=reader,
-                         args=(sock, args, data, img_q, stop_evt),
+                         args=(sock, args, ring, stop_evt),
                          daemon=True)
     t.start()
 
@@ -102,12 +126,88 @@ def main():
     cv2.namedWindow("GPR B-scan", cv2.WINDOW_NORMAL)
     cv2.resizeWindow("GPR B-scan", 800, 600)
 
+    # circular write index instead of np.roll: each trace moves main_n*2
+    # bytes, not the whole main_n×window array
+    filled      = 0
+    col         = 0
+    last_render = time.monotonic()
+    skipped     = 0   # traces ingested without triggering a redraw
+    # reused per-frame buffers — the render path allocates nothing
+    view_buf = np.empty_like(data)
+    f32_tmp  = np.empty(data.shape, dtype=np.float32)
+    disp     = np.empty(data.shape, dtype=np.uint8)
+    # streaming AGC: an incrementally maintained histogram of the visible
+    # window drives a 1st/99th-percentile contrast stretch, so weak
+    # reflections use the full 0–255 range instead of a fixed 16-bit map
+    hist      = np.zeros(65536, dtype=np.int64)
+    cdf_buf   = np.empty(65536, dtype=np.int64)
+    idx_tmp   = np.empty(main_n, dtype=np.intp)
+    agc_lo, agc_hi = -32768, 32767
+    agc_dirty = 0
+    # all steady-state buffers exist now; freeze them out of GC scans.
+    # With the render path allocation-free, normal GC stays cheap — no
+    # need for the old gc.disable()/gc.enable() bracketing
+    gc.freeze()
     while True:
-        try:
-            img = img_q.get(timeout=0.1)
-            cv2.imshow("GPR B-scan", img)
-        except queue.Empty:
-            cv2.waitKey(1)
+        # drain every trace currently in the ring (bounded by one window)
+        # before deciding whether to render — amortises the fixed per-draw
+        # cost over however many traces arrived since the last frame
+        ingested = 0
+        while ring.tail < ring.head and ingested < args.window:
+            trace = ring.slots[ring.tail & RING_MASK]
+            # keep the histogram in sync: drop the departing column's
+            # counts, add the new trace's — O(main_n) per trace
+            if filled == args.window:
+                np.add(data[:, col], BIAS, out=idx_tmp, casting='unsafe')
+                np.subtract.at(hist, idx_tmp, 1)
+            np.add(trace, BIAS, out=idx_tmp, casting='unsafe')
+            np.add.at(hist, idx_tmp, 1)
+            data[:, col] = trace
+            col = (col + 1) % args.window
+            if filled < args.window:
+                filled += 1
+            ring.tail += 1
+            ingested += 1
+
+            agc_dirty += 1
+            if agc_dirty >= AGC_EVERY:
+                agc_dirty = 0
+                np.cumsum(hist, out=cdf_buf)
+                total = int(cdf_buf[-1])
+                if total:
+                    lo = int(np.searchsorted(cdf_buf, 0.01 * total)) - 32768
+                    hi = int(np.searchsorted(cdf_buf, 0.99 * total)) - 32768
+                    if hi > lo:
+                        agc_lo, agc_hi = lo, hi
+
+        if ingested:
+            now = time.monotonic()
+            if now - last_render < RENDER_INTERVAL:
+                skipped += ingested
+            else:
+                last_render = now
+                # reorder columns oldest→newest only at render time
+                if filled < args.window:
+                    view = data
+                else:
+                    np.concatenate((data[:, col:], data[:, :col]),
+                                   axis=1, out=view_buf)
+                    view = view_buf
+                # stretch the 1st–99th percentile band into 0–255; with no
+                # data yet this degenerates to the old full-range linear map.
+                # Typed scalar forces the float32 loop — a plain int would
+                # bind to int16 under NEP 50 and wrap before the cast
+                np.subtract(view, np.float32(agc_lo), out=f32_tmp)
+                f32_tmp *= 255.0 / (agc_hi - agc_lo)
+                np.clip(f32_tmp, 0, 255, out=f32_tmp)
+                disp[...] = f32_tmp
+                cv2.imshow("GPR B-scan", disp)
+        else:
+            # ring empty: sleep until the producer publishes instead of
+            # spin-polling (clear, re-check, then wait — no missed wakeup)
+            ring.ready.clear()
+            if ring.tail == ring.head:
+                ring.ready.wait(timeout=0.05)
 
         if cv2.waitKey(1) == 27:
             break
@@ -115,7 +215,8 @@ def main():
     stop_evt.set()
     sock.close()
     cv2.destroyAllWindows()
-    gc.enable()
+    print(f"coalesced {skipped} traces into throttled frames, "
+          f"ring dropped {ring.dropped}")
 
 if __name__ == '__main__':
     main()
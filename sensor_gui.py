@@ -3,9 +3,10 @@ import sys
 import threading
 import time
 
+import numpy as np
 import rclpy
 from rclpy.node import Node
-from rclpy.executors import SingleThreadedExecutor
+from rclpy.executors import MultiThreadedExecutor
 
 from px4_msgs.msg import VehicleGlobalPosition
 from sensor_msgs.msg import Range
@@ -19,6 +20,9 @@ from PyQt5.QtCore import QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 
+# history depth for the GPS path and distance plots
+HIST_N = 4096
+
 class GuiNode(Node):
     def __init__(self):
         super().__init__('sensor_gui')
@@ -26,10 +30,17 @@ class GuiNode(Node):
         self.lon = 0.0
         self.alt = 0.0
         self.dist = 0.0
-        # history
-        self.path = []       # list of (lat, lon)
-        self.times = []      # relative timestamps
-        self.dist_hist = []  # distance history
+        # fixed-size ring buffers instead of unbounded lists: head is the
+        # next write slot, n the fill level (path and distance tick at
+        # different rates, so each pair has its own indices)
+        self.lat_buf = np.zeros(HIST_N)
+        self.lon_buf = np.zeros(HIST_N)
+        self.path_head = 0
+        self.path_n = 0
+        self.t_buf = np.zeros(HIST_N)
+        self.d_buf = np.zeros(HIST_N)
+        self.dist_head = 0
+        self.dist_n = 0
 
         self.create_subscription(
             VehicleGlobalPosition,
@@ -47,14 +58,27 @@ class GuiNode(Node):
         self.lon = msg.lon
         self.alt = msg.alt
         # record path
-        self.path.append((self.lat, self.lon))
+        i = self.path_head
+        self.lat_buf[i] = msg.lat
+        self.lon_buf[i] = msg.lon
+        self.path_head = (i + 1) % HIST_N
+        self.path_n = min(self.path_n + 1, HIST_N)
 
     def range_cb(self, msg):
         self.dist = msg.range
         # record distance vs time
-        t = time.time() - self.start_time
-        self.times.append(t)
-        self.dist_hist.append(self.dist)
+        i = self.dist_head
+        self.t_buf[i] = time.time() - self.start_time
+        self.d_buf[i] = msg.range
+        self.dist_head = (i + 1) % HIST_N
+        self.dist_n = min(self.dist_n + 1, HIST_N)
+
+    @staticmethod
+    def ordered(buf, head, n):
+        """Oldest→newest view of a ring buffer (copies only once wrapped)."""
+        if n < HIST_N:
+            return buf[:n]
+        return np.concatenate((buf[head:], buf[:head]))
 
 
 class PlotCanvas(FigureCanvasQTAgg):
@@ -63,31 +87,26 @@ class PlotCanvas(FigureCanvasQTAgg):
         super().__init__(fig)
         self.ax1 = fig.add_subplot(121)
         self.ax2 = fig.add_subplot(122)
-        # initial labels
+        # titles/labels set once; updates only touch the line artists
         self.ax1.set_title("GPS Path")
         self.ax1.set_xlabel("Longitude")
         self.ax1.set_ylabel("Latitude")
         self.ax2.set_title("Distance vs Time")
         self.ax2.set_xlabel("Time (s)")
         self.ax2.set_ylabel("Distance (m)")
-
-    def update(self, path, times, dist_hist):
-        # clear and redraw
-        self.ax1.cla()
-        self.ax1.set_title("GPS Path")
-        if path:
-            lats, lons = zip(*path)
-            self.ax1.plot(lons, lats, '-o', markersize=2)
-        self.ax1.set_xlabel("Lon")
-        self.ax1.set_ylabel("Lat")
-
-        self.ax2.cla()
-        self.ax2.set_title("Distance vs Time")
-        if times:
-            self.ax2.plot(times, dist_hist, '-')
-        self.ax2.set_xlabel("Time (s)")
-        self.ax2.set_ylabel("Dist (m)")
-
+        # persistent artists, updated via set_data instead of cla()+plot()
+        self.path_ln, = self.ax1.plot([], [], '-o', markersize=2)
+        self.dist_ln, = self.ax2.plot([], [], '-')
+
+    def update(self, lats, lons, times, dists):
+        if lats.size:
+            self.path_ln.set_data(lons, lats)
+            self.ax1.relim()
+            self.ax1.autoscale_view()
+        if times.size:
+            self.dist_ln.set_data(times, dists)
+            self.ax2.relim()
+            self.ax2.autoscale_view()
         self.draw()
 
 
@@ -113,10 +132,12 @@ class MainWindow(QWidget):
 
     def update_display(self):
         # repaint with new data
+        node = self.ros_node
         self.canvas.update(
-            self.ros_node.path,
-            self.ros_node.times,
-            self.ros_node.dist_hist
+            node.ordered(node.lat_buf, node.path_head, node.path_n),
+            node.ordered(node.lon_buf, node.path_head, node.path_n),
+            node.ordered(node.t_buf, node.dist_head, node.dist_n),
+            node.ordered(node.d_buf, node.dist_head, node.dist_n)
         )
 
 
@@ -124,8 +145,9 @@ def main():
     rclpy.init()
     ros_node = GuiNode()
 
-    # spin ROS in background
-    executor = SingleThreadedExecutor()
+    # spin ROS in background; two executor threads so the GPS and range
+    # callbacks keep draining while the Qt timer does its 200 ms redraw
+    executor = MultiThreadedExecutor(num_threads=2)
     executor.add_node(ros_node)
     threading.Thread(target=executor.spin, daemon=True).start()
 
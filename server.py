@@ -36,12 +36,21 @@ def main():
     print(f"[+] Requested DISTANCE_SENSOR @ {args.rate} Hz")
 
     try:
+        deadline = time.time() + 5
         while True:
-            # Blocking wait for next DISTANCE_SENSOR
-            msg = m.recv_match(type='DISTANCE_SENSOR', blocking=True, timeout=5)
+            # recv_msg() skips recv_match's per-message type-name string
+            # compare and match-list scan; filter on the numeric msg id
+            msg = m.recv_msg()
             if msg is None:
-                print("[!] No DISTANCE_SENSOR in 5 s, retrying…")
+                # nothing buffered yet — brief sleep instead of busy-spin
+                if time.time() > deadline:
+                    print("[!] No DISTANCE_SENSOR in 5 s, retrying…")
+                    deadline = time.time() + 5
+                time.sleep(0.01)
                 continue
+            if msg.get_msgId() != MSG_ID:
+                continue
+            deadline = time.time() + 5
             # Fields per MAVLink common spec :contentReference[oaicite:0]{index=0}
             dist_cm = msg.distance        # uint16_t in cm
             min_cm  = msg.min_distance    # minimum sensor range
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""Build the optional gpr_io C extension: python3 setup.py build_ext --inplace"""
+import platform
+
+from setuptools import setup, Extension
+
+extra_compile_args = ['-O3']
+if platform.machine() == 'aarch64':
+    # Jetson: NEON byte swap in gpr_io.c
+    extra_compile_args.append('-march=armv8-a+simd')
+
+setup(
+    name='gpr_io',
+    version='0.1',
+    description='C helper for hot GPR trace reads (recv + in-place byte swap)',
+    ext_modules=[
+        Extension('gpr_io', sources=['gpr_io.c'],
+                  extra_compile_args=extra_compile_args),
+    ],
+)